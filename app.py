@@ -1,35 +1,95 @@
-import json
+import functools
 from datetime import timedelta
 from pathlib import Path
 
 import dash
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.subplots
+import requests_cache
 from dash.dependencies import Input, Output, State
 from pandas_datareader import data
 
 import app_components.layout
 import app_components.charts
+import app_components.store
 from sentiment_analysis.sentiment import utils
 from sentiment_analysis.sentiment.sentiment_analyser import SentimentAnalyser
 
 sentiment_analyser = SentimentAnalyser()
 reddit_data_path = Path('sentiment_analysis/reddit_data/')
 
+# cache Yahoo Finance responses on disk for a day
+price_session = requests_cache.CachedSession(
+    cache_name='price_cache',
+    expire_after=timedelta(days=1)
+)
+
 app = dash.Dash(__name__)
 server = app.server
 
 app.layout = app_components.layout.layout
 
+@functools.lru_cache(maxsize=16)
+def _load_submissions(ticker):
+    """
+    Read stored Reddit submissions for a ticker, sorted by score
+    """
+    return pd.read_parquet(
+        reddit_data_path / f'{ticker}.parquet',
+        engine='pyarrow'
+    )
+
+@functools.lru_cache(maxsize=16)
+def _fetch_prices(ticker, start, end):
+    """
+    Get historical stock price data from Yahoo Finance
+    """
+    return data.DataReader(
+        name=ticker,
+        data_source='yahoo',
+        start=start,
+        end=end,
+        session=price_session
+    )
+
+def _filter_submissions(ticker, minimum_upvote):
+    """
+    Get stored Reddit submissions for a ticker with minimum_upvote or more
+    """
+    submissions = _load_submissions(ticker)
+    
+    # submissions are sorted by score so the filter is a slice
+    cut = submissions.score.searchsorted(minimum_upvote, side='left')
+    return submissions.iloc[cut:]
+
+@functools.lru_cache(maxsize=16)
+def _freqdist(ticker, minimum_upvote):
+    """
+    Create the full frequency distribution of preprocessed submission titles
+    """
+    submissions = _filter_submissions(ticker, minimum_upvote)
+    return sentiment_analyser.create_freqdist(
+        submissions.preprocessed_title,
+        max_words=None
+    )
+
+@functools.lru_cache(maxsize=32)
+def _wordcloud_image(freqdist, max_words):
+    """
+    Render a wordcloud image from a serialised freqdist
+    """
+    freqdist = app_components.store.decode_dataframe(freqdist)
+    wordcloud = sentiment_analyser.create_wordcloud_from_freqdist(
+        freqdist,
+        max_words=max_words
+    )
+    return wordcloud.to_array()
+
 # get submissions and stock price data
 @app.callback(
     [
-        Output('submissions_store', 'children'),
-        Output('stock_price_store', 'children'),
-        Output('preprocessed_text_store', 'children'),
-        Output('unprocessed_text_store', 'children'),
+        Output('submissions_store', 'data'),
+        Output('stock_price_store', 'data'),
+        Output('freqdist_store', 'data'),
         Output('data_loading', 'debug')
     ],
     [
@@ -43,35 +103,27 @@ def get_data(submit, minimum_upvote, ticker):
     Get Reddit submissions
     """
     
-    # read in submissions
-    submissions = pd.read_pickle(reddit_data_path / f'{ticker}.pkl')
+    # read in submissions, preprocessed and scored by build_data.py
+    submissions = _filter_submissions(ticker, minimum_upvote)
+    freqdist = _freqdist(ticker, minimum_upvote)
     
-    # filter submissions
-    submissions = submissions[submissions.score >= minimum_upvote]
-
-    # preprocess text for analysis
-    text = submissions.title.tolist()
-    preprocessed_text = sentiment_analyser.preprocess_text(text)
+    # order submissions for the sentiment chart and table
+    submissions = submissions.drop(columns='preprocessed_title') \
+                             .sort_values('created_utc')
     
-    # set dates for stock price data
-    start = submissions.created_utc.min().date() - timedelta(weeks=2)
-    end = submissions.created_utc.max().date() + timedelta(weeks=2)
+    # set dates for stock price data, submissions are in date order
+    start = submissions.created_utc.iloc[0].date() - timedelta(weeks=2)
+    end = submissions.created_utc.iloc[-1].date() + timedelta(weeks=2)
 
     # get historical stock price data
-    price_data = data.DataReader(
-        name=ticker,
-        data_source='yahoo',
-        start=start,
-        end=end,
-    )
+    price_data = _fetch_prices(ticker, start, end)
     
-    # convert to json for storage
-    submissions = submissions.to_json(date_format='iso')
-    price_data = price_data.to_json(date_format='iso')
-    preprocessed_text = json.dumps(preprocessed_text)
-    text = json.dumps(text)
+    # serialise dataframes for storage
+    submissions = app_components.store.encode_dataframe(submissions)
+    price_data = app_components.store.encode_dataframe(price_data)
+    freqdist = app_components.store.encode_dataframe(freqdist)
     
-    return [submissions, price_data, preprocessed_text, text, False]
+    return [submissions, price_data, freqdist, False]
 
 # create wordcloud and freqdist
 @app.callback(
@@ -80,138 +132,76 @@ def get_data(submit, minimum_upvote, ticker):
         Output('freqdist', 'figure')
     ],
     [
-        Input('preprocessed_text_store', 'children'),
+        Input('freqdist_store', 'data'),
         Input('max_words', 'value')
     ]
 )
-def generate_wordcloud_freqdist(preprocessed_text, max_words):
+def generate_wordcloud_freqdist(freqdist, max_words):
     """
     Create wordcloud and frequency distribution
     """
     
-    # read preprocessed text
-    preprocessed_text = json.loads(preprocessed_text)
-
-    # create wordcloud
-    wordcloud = sentiment_analyser.create_wordcloud(
-        preprocessed_text,
-        max_words=max_words
-    )
+    # create wordcloud, reusing images of repeat selections
+    wordcloud = _wordcloud_image(freqdist, max_words)
     
-    # create freqdist
-    freqdist = sentiment_analyser.create_freqdist(
-        preprocessed_text,
-        max_words=max_words
-    )
+    # get the most common words from the full freqdist
+    freqdist = app_components.store.decode_dataframe(freqdist)
+    freqdist = freqdist[:max_words]
 
-    # create wordcloud figure
-    wordcloud_fig = px.imshow(wordcloud)
-    wordcloud_fig.update_layout(
-        width=500, 
-        height=400, 
-        margin=dict(l=2, r=2, b=2, t=2),
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    wordcloud_fig.update_xaxes(showticklabels=False)
-    wordcloud_fig.update_yaxes(showticklabels=False)
-    wordcloud_fig.update_traces(hovertemplate=None, hoverinfo='skip')
-    
-    # create freqdist figure
-    freqdist_fig = px.bar(freqdist, x='count', y='word')
-    freqdist_fig.update_layout(
-        width=400,
-        height=400,
-        margin=dict(l=10, r=10, b=10, t=10),
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    freqdist_fig.update_yaxes(autorange='reversed')
+    # create wordcloud and freqdist figures
+    wordcloud_fig = app_components.charts.generate_wordcloud_figure(wordcloud)
+    freqdist_fig = app_components.charts.generate_freqdist_figure(freqdist)
 
     return [wordcloud_fig, freqdist_fig]
 
-# create sentiment chart and table
+# create submissions table
 @app.callback(
+    Output('submissions_table', 'children'),
     [
-        Output('sentiment', 'figure'),
-        Output('submissions_table', 'children')
-    ],
+        Input('submissions_store', 'data')
+    ]
+)
+def generate_submissions_table(submissions):
+    """
+    Create submissions table
+    """
+    
+    # get submissions
+    submissions = app_components.store.decode_dataframe(submissions)
+    
+    return app_components.charts.generate_table(submissions)
+
+# create rolling sentiment chart
+@app.callback(
+    Output('sentiment', 'figure'),
     [
-        Input('submissions_store', 'children'),
-        Input('stock_price_store', 'children'),
-        Input('preprocessed_text_store', 'children'),
-        Input('unprocessed_text_store', 'children'),
+        Input('submissions_store', 'data'),
+        Input('stock_price_store', 'data'),
         Input('sentiment_smoothness', 'value')
     ]
 )
-def generate_sentiment(
-    submissions,
-    stock_prices,
-    preprocessed_text,
-    unprocessed_text,
-    window
-    ):
+def generate_sentiment_chart(submissions, stock_prices, window):
     """
     Create rolling sentiment chart
     """
     
-    # get submissions, stock prices, preprocessed and unprocessed text
-    submissions = pd.read_json(submissions)
-    stock_prices = pd.read_json(stock_prices).Close
-    preprocessed_text = json.loads(preprocessed_text)
-    unprocessed_text = json.loads(unprocessed_text)
-    
-    # get sentiment scores
-    sentiment = sentiment_analyser.sentiment_score(
-        preprocessed_text,
-        customise_vader=True
-    )
-    
-    # merge sentiment scores with submissions
-    merged = utils.merge_sentiment_submissions(
-        sentiment_scores=sentiment,
-        text=unprocessed_text,
-        submissions=submissions,
-        on='title'
-    )
+    # get submissions and stock prices
+    submissions = app_components.store.decode_dataframe(submissions)
+    stock_prices = app_components.store.decode_dataframe(stock_prices).Close
     
     # calculate rolling sentiment
-    merged['rolling_sentiment'] = merged.sentiment_score \
-                                        .rolling(window) \
-                                        .mean()
+    submissions['rolling_sentiment'] = utils.rolling_mean(
+        submissions.sentiment_score,
+        window
+    )
 
     # create rolling sentiment figure
-    fig = plotly.subplots.make_subplots(
-        rows=2,
-        cols=1,
-        shared_xaxes=True,
-        subplot_titles=[f'Stock Price', 'Rolling Sentiment'],
-        row_heights=[0.7, 0.3],
-        vertical_spacing=0.1
-    )
-    price_line = go.Scatter(
-        x=stock_prices.index,
-        y=stock_prices.values,
-        mode='lines',
-        name='close price'
+    fig = app_components.charts.generate_sentiment_figure(
+        stock_prices,
+        submissions
     )
-    sentiment_line = go.Scatter(
-        x=merged.created_utc,
-        y=merged.rolling_sentiment,
-        mode='lines',
-        name='rolling sentiment'
-    )
-    fig.add_trace(price_line, row=1, col=1)
-    fig.add_trace(sentiment_line, row=2, col=1)
-    fig.update_layout(
-        width=800,
-        height=800,
-        showlegend=False,
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    # create submissions table
-    submissions_table = app_components.charts.generate_table(merged)
     
-    return [fig, submissions_table]
+    return fig
 
 
 if __name__ == "__main__":
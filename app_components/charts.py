@@ -1,6 +1,10 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
+import dash_table
+import pandas as pd
+import plotly.express as px
+import plotly.subplots
 
 from . import styles
 
@@ -70,14 +74,100 @@ submissions_table = html.Div(
 )
 
 
-def generate_table(dataframe, max_rows=1000000000):
-    return html.Table([
-        html.Thead(
-            html.Tr([html.Th(col.replace('_', ' ').upper()) for col in dataframe.columns])
-        ),
-        html.Tbody([
-            html.Tr([
-                html.Td(dataframe.iloc[i][col]) for col in dataframe.columns
-            ]) for i in range(min(len(dataframe), max_rows))
-        ])
-    ])
+def generate_table(dataframe):
+    # virtualization only renders the rows scrolled into view
+    return dash_table.DataTable(
+        columns=[
+            {'name': col.replace('_', ' ').upper(), 'id': col}
+            for col in dataframe.columns
+        ],
+        data=dataframe.to_dict('records'),
+        virtualization=True,
+        fixed_rows={'headers': True},
+        page_action='none',
+        style_table=styles.submissions_table_table_style,
+        style_cell=styles.submissions_table_cell_style
+    )
+
+
+# figure layouts don't depend on the data so they're only built once
+freqdist_layout = px.bar(
+    pd.DataFrame(columns=['word', 'count']),
+    x='count',
+    y='word'
+).update_layout(
+    width=400,
+    height=400,
+    margin=dict(l=10, r=10, b=10, t=10),
+    paper_bgcolor='rgba(0,0,0,0)'
+).update_yaxes(
+    autorange='reversed'
+).to_dict()['layout']
+
+sentiment_layout = plotly.subplots.make_subplots(
+    rows=2,
+    cols=1,
+    shared_xaxes=True,
+    subplot_titles=[f'Stock Price', 'Rolling Sentiment'],
+    row_heights=[0.7, 0.3],
+    vertical_spacing=0.1
+).update_layout(
+    width=800,
+    height=800,
+    showlegend=False,
+    paper_bgcolor='rgba(0,0,0,0)'
+).to_dict()['layout']
+
+
+def generate_wordcloud_figure(wordcloud):
+    wordcloud_fig = px.imshow(wordcloud)
+    wordcloud_fig.update_layout(
+        width=500, 
+        height=400, 
+        margin=dict(l=2, r=2, b=2, t=2),
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    wordcloud_fig.update_xaxes(showticklabels=False)
+    wordcloud_fig.update_yaxes(showticklabels=False)
+    wordcloud_fig.update_traces(hovertemplate=None, hoverinfo='skip')
+
+    return wordcloud_fig
+
+
+def generate_freqdist_figure(freqdist):
+    word_counts = dict(
+        type='bar',
+        x=freqdist['count'],
+        y=freqdist['word'],
+        orientation='h',
+        marker=dict(color='#636efa'),
+        hovertemplate='count=%{x}<br>word=%{y}<extra></extra>',
+        showlegend=False,
+        xaxis='x',
+        yaxis='y'
+    )
+
+    return dict(data=[word_counts], layout=freqdist_layout)
+
+
+def generate_sentiment_figure(stock_prices, sentiment):
+    price_line = dict(
+        type='scatter',
+        x=stock_prices.index,
+        y=stock_prices.values,
+        mode='lines',
+        name='close price',
+        xaxis='x',
+        yaxis='y'
+    )
+    sentiment_line = dict(
+        type='scatter',
+        x=sentiment.created_utc,
+        y=sentiment.rolling_sentiment,
+        mode='lines',
+        name='rolling sentiment',
+        xaxis='x2',
+        yaxis='y2'
+    )
+
+    return dict(data=[price_line, sentiment_line], layout=sentiment_layout)
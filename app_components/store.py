@@ -1,10 +1,32 @@
+import base64
+
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
+import pyarrow as pa
 
 store = html.Div([
-    html.Div(id='submissions_store'),
-    html.Div(id='stock_price_store'),
-    html.Div(id='preprocessed_text_store'),
-    html.Div(id='unprocessed_text_store')
-], style={'display': 'none'})
+    dcc.Store(id='submissions_store', storage_type='memory'),
+    dcc.Store(id='stock_price_store', storage_type='memory'),
+    dcc.Store(id='freqdist_store', storage_type='memory')
+])
+
+
+def encode_dataframe(dataframe):
+    """
+    Serialise a DataFrame to a base64 Arrow IPC stream for a dcc.Store
+    """
+    table = pa.Table.from_pandas(dataframe)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return base64.b64encode(sink.getvalue()).decode()
+
+
+def decode_dataframe(payload):
+    """
+    Deserialise a DataFrame created by encode_dataframe
+    """
+    reader = pa.ipc.open_stream(base64.b64decode(payload))
+    return reader.read_pandas()
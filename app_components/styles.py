@@ -60,3 +60,14 @@ submissions_table_style =  {
     'fontSize': '14px',
     'margin': 'auto'
 }
+
+submissions_table_table_style = {
+    'height': '650px',
+    'overflowY': 'auto'
+}
+
+submissions_table_cell_style = {
+    'textAlign': 'left',
+    'whiteSpace': 'normal',
+    'height': 'auto'
+}
@@ -0,0 +1,65 @@
+"""
+Builds the Parquet submission files read by the app from the Reddit
+submission pickles in sentiment_analysis/reddit_data/. Titles are
+preprocessed and scored for sentiment here so the app doesn't have to.
+
+run ```python build_data.py``` from the project root after updating the pickles.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from sentiment_analysis.sentiment.sentiment_analyser import SentimentAnalyser
+
+sentiment_analyser = SentimentAnalyser()
+reddit_data_path = Path('sentiment_analysis/reddit_data/')
+
+
+def build_submissions(path: Path) -> Path:
+    """
+    Convert a submissions pickle to Parquet with preprocessed_title and
+    sentiment_score columns
+
+    Args:
+        path (Path): path to the submissions pickle
+
+    Returns:
+        [Path]: path to the Parquet file
+    """
+
+    submissions = pd.read_pickle(path)
+
+    # preprocess titles and score their sentiment
+    preprocessed_text = sentiment_analyser.preprocess_text(
+        submissions.title.tolist()
+    )
+    submissions['preprocessed_title'] = pd.Series(
+        preprocessed_text,
+        index=submissions.index,
+        dtype=object
+    )
+    submissions['sentiment_score'] = sentiment_analyser.sentiment_score(
+        preprocessed_text,
+        customise_vader=True
+    )
+
+    # sort by score so minimum upvote filters are a binary search
+    submissions = submissions.sort_values('score', kind='mergesort')
+
+    # write with pyarrow, sorted row groups keep score statistics tight
+    parquet_path = path.with_suffix('.parquet')
+    submissions.to_parquet(
+        parquet_path,
+        engine='pyarrow',
+        compression='zstd',
+        index=False,
+        row_group_size=50_000
+    )
+
+    return parquet_path
+
+
+if __name__ == "__main__":
+    for path in sorted(reddit_data_path.glob('*.pkl')):
+        print(build_submissions(path))
@@ -273,7 +273,7 @@ class RedditAPI:
             params (dict): parameters dictionary
         """
         # Append created_utc to fields if not included
-        if 'fields' in list(params.keys()):
+        if 'fields' in params:
             if 'created_utc' not in params['fields']:
                 params['fields'].append('created_utc')
 
@@ -1,15 +1,20 @@
+import collections
+import itertools
+import math
 import re
-import statistics
 import string
 from pathlib import Path
 
 import nltk
+import numpy as np
 import pandas as pd
-from nltk import FreqDist, WordNetLemmatizer
-from nltk.corpus import stopwords, wordnet
+from joblib import Parallel, delayed, effective_n_jobs
+from nltk import WordNetLemmatizer
+from nltk.corpus import stopwords
+from nltk.corpus.reader.wordnet import ADJ, ADV, NOUN, VERB
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.tag import pos_tag
-from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.tag import pos_tag_sents
+from nltk.tokenize import sent_tokenize
 from wordcloud import WordCloud
 
 from config import Loggers
@@ -18,6 +23,36 @@ from . import additional_stopwords, custom_lexicon
 # Set path to nltk data 
 nltk.data.path.append(Path('sentiment_analysis/nltk_data'))
 
+# stop words including custom stop words, read once per process
+_stop_words = frozenset(
+    stopwords.words('english') + additional_stopwords.words
+)
+
+# RegEx search patterns to remove, combined so text is only scanned once
+_url_pattern = "http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+#]|[!*\(\),]|" \
+               "(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+_punctuation_pattern = "[^-9A-Za-z ]"
+_clean_pattern = re.compile(f"(?:{_url_pattern})|{_punctuation_pattern}")
+
+# once cleaned, text only contains letters, '9', '-' and spaces, so the
+# only word_tokenize rules that still apply are splitting double dashes
+# and these contractions e.g. 'gonna' --> 'gon na'
+_contraction_pattern = re.compile(
+    r"(?i)\b(can(?=not)|gim(?=me)|gon(?=na)|got(?=ta)|lem(?=me)"
+    r"|wan(?=na(?:\s|$)))(not|me|na|ta)\b"
+)
+
+# first letter of Penn Treebank tags mapped to wordnet POS tags
+_tag_map = {
+    'J': ADJ,
+    'V': VERB,
+    'N': NOUN,
+    'R': ADV,
+}
+
+# vader sentiment analysers initialised once per process
+_vader_cache = {}
+
 class SentimentAnalyser:
     """
     Uses the Python Natural Language Toolkit (NLTK) to perform sentiment
@@ -27,23 +62,24 @@ class SentimentAnalyser:
     def __init__(self):
         self.logger = Loggers.console
         
-    def _clean_text(self, text, stop_words, search_patterns):
+        # reused for every sentence rather than constructed per call
+        self._lemmatizer = WordNetLemmatizer()
+        
+    def _clean_text(self, text):
         """
-        Removes unwanted tokens based on RegEx search patters using
+        Removes URLs, punctuation and stop words from text using
         python RegEx library.
 
         Args:
             text (str): text to clean
-            stop_words (list): list of stop words to remove
-            search_patterns (list): list of python RegEx search patters to remove
         """
         
         # substitute search pattern matches
-        for pattern in search_patterns:
-            text = re.sub(pattern, "", text)
+        text = _clean_pattern.sub("", text)
         
-        # tokenize text
-        tokens = word_tokenize(text)
+        # tokenize text, same tokens as word_tokenize on cleaned text
+        text = text.replace("--", " -- ")
+        tokens = _contraction_pattern.sub(r" \1 \2 ", text).split()
         
         # remove punctuation, stopwords
         cleaned_tokens = []
@@ -52,7 +88,7 @@ class SentimentAnalyser:
             # skip unwanted tokens
             if (not token 
                     or token in string.punctuation
-                    or token.lower() in stop_words):
+                    or token.lower() in _stop_words):
                 continue
 
             cleaned_tokens.append(token.lower())
@@ -68,16 +104,7 @@ class SentimentAnalyser:
             tag (str): string tag
         """
 
-        if tag.startswith('J'):
-            return wordnet.ADJ
-        elif tag.startswith('V'):
-            return wordnet.VERB
-        elif tag.startswith('N'):
-            return wordnet.NOUN
-        elif tag.startswith('R'):
-            return wordnet.ADV
-        else:
-            return wordnet.NOUN
+        return _tag_map.get(tag[:1], NOUN)
         
     def _lemmatize_tokens(self, tagged_tokens):
         """
@@ -92,8 +119,6 @@ class SentimentAnalyser:
             tagged_tokens (list): list of tuples like (word, tag)
         """
         
-        lemmatizer = WordNetLemmatizer()
-        
         lemmatized_sentence = []
         for word, tag in tagged_tokens:
             
@@ -101,7 +126,7 @@ class SentimentAnalyser:
             pos = self._simplify_tag(tag)
             
             # lemmatize the word
-            lemmatized_word = lemmatizer.lemmatize(word, pos)
+            lemmatized_word = self._lemmatizer.lemmatize(word, pos)
             lemmatized_sentence.append(lemmatized_word)
 
         return lemmatized_sentence
@@ -110,7 +135,9 @@ class SentimentAnalyser:
         """
         Flatten preprocessed_text into a 1D array
         """
-        return [text for entry in preprocessed_text for sublist in entry for text in sublist]
+        return list(itertools.chain.from_iterable(
+            itertools.chain.from_iterable(preprocessed_text)
+        ))
     
     def _customize_vader(self, vader):
         """
@@ -119,7 +146,83 @@ class SentimentAnalyser:
         vader.lexicon |= custom_lexicon.financial_jargon
         return vader
     
-    def preprocess_text(self, text_list: list) -> list:
+    def _get_vader(self, customise_vader):
+        """
+        Returns a vader sentiment analyser, initialising it once per process
+        so parallel workers don't reload the lexicon for every chunk
+        """
+        if customise_vader not in _vader_cache:
+            vader = SentimentIntensityAnalyzer()
+            vader = self._customize_vader(vader) if customise_vader else vader
+            _vader_cache[customise_vader] = vader
+
+        return _vader_cache[customise_vader]
+    
+    def _split_chunks(self, items, n_jobs):
+        """
+        Split items into one contiguous chunk per worker
+        """
+        chunk_size = max(1, math.ceil(len(items) / effective_n_jobs(n_jobs)))
+        return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    
+    def _score_items(self, preprocessed_text, customise_vader):
+        """
+        Calculate the mean compound sentiment of each preprocessed item
+        """
+        vader = self._get_vader(customise_vader)
+
+        # join and score every sentence in a single pass
+        sentences = [' '.join(sentence) for item in preprocessed_text for sentence in item]
+        sentence_scores = np.fromiter(
+            (vader.polarity_scores(sentence)['compound'] for sentence in sentences),
+            dtype=np.float64,
+            count=len(sentences)
+        )
+        
+        # take mean sentiment of each item's sentences, items without
+        # sentences have no sentiment
+        lengths = np.array([len(item) for item in preprocessed_text], dtype=np.intp)
+        offsets = np.cumsum(lengths) - lengths
+        has_sentences = lengths > 0
+        
+        item_scores = np.full(len(preprocessed_text), np.nan)
+        item_scores[has_sentences] = np.add.reduceat(
+            sentence_scores,
+            offsets[has_sentences]
+        ) / lengths[has_sentences]
+                
+        return item_scores
+    
+    def _preprocess_items(self, text_list):
+        """
+        Clean, tag and lemmatise each text in text_list
+        """
+        
+        # split text into sentences
+        text_sentences = [sent_tokenize(text) for text in text_list]
+        
+        # remove unwanted text
+        clean_sentences = [
+            self._clean_text(sentence)
+            for sentences in text_sentences for sentence in sentences
+        ]
+        
+        # tag all sentences in one batch then lemmatize text
+        tagged_sentences = pos_tag_sents(clean_sentences)
+        lemmatized_sentences = iter([
+            self._lemmatize_tokens(tagged_sentence)
+            for tagged_sentence in tagged_sentences
+        ])
+        
+        # regroup sentences by text
+        preprocessed_text = [
+            [next(lemmatized_sentences) for _ in sentences]
+            for sentences in text_sentences
+        ]
+            
+        return preprocessed_text
+    
+    def preprocess_text(self, text_list: list, n_jobs: int=-1) -> list:
         """
         Preprocess text for analysis by cleaning, tagging and lemmatising.
         
@@ -130,43 +233,20 @@ class SentimentAnalyser:
                         ['This is a long reddit post'],
                         ['This is another long reddit post']
                     ]
+            n_jobs (int):
+                number of processes to preprocess with, -1 uses all cores
         """
         
         self.logger.info('Preprocessing text')
         
-        # RegEx search patterns to remove
-        punctuation_pattern = "[^-9A-Za-z ]"
-        url_pattern = "http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+#]|[!*\(\),]|" \
-                       "(?:%[0-9a-fA-F][0-9a-fA-F]))+"
-        search_patterns = [url_pattern, punctuation_pattern]
-        
-        # add custom stop words
-        stop_words = stopwords.words('english') + additional_stopwords.words
+        # preprocess chunks of text in parallel
+        chunks = self._split_chunks(text_list, n_jobs)
+        chunk_text = Parallel(n_jobs=n_jobs)(
+            delayed(self._preprocess_items)(chunk)
+            for chunk in chunks
+        )
         
-        preprocessed_text = []
-        for text in text_list:
-            
-            # split text into sentences
-            preprocessed_sentences = []
-            sentences = sent_tokenize(text)
-            for sentence in sentences:
-                
-                # remove unwanted text
-                clean_sentence = self._clean_text(
-                    text=sentence,
-                    stop_words=stop_words,
-                    search_patterns=search_patterns
-                )
-
-                # lemmatize text
-                tagged_sentence = pos_tag(clean_sentence)
-                lemmatized_sentence = self._lemmatize_tokens(tagged_sentence)
-            
-                preprocessed_sentences.append(lemmatized_sentence)
-            
-            preprocessed_text.append(preprocessed_sentences)
-            
-        return preprocessed_text
+        return [item for items in chunk_text for item in items]
     
     def create_wordcloud(
         self,
@@ -183,11 +263,36 @@ class SentimentAnalyser:
                 text that has been preprocessed by the preprocess_text function
         """
         
+        # create frequency distribution
+        fd = self.create_freqdist(preprocessed_text, max_words=max_words)
+        
+        return self.create_wordcloud_from_freqdist(
+            fd,
+            max_words=max_words,
+            colormap=colormap,
+            background_color=background_color
+        )
+    
+    def create_wordcloud_from_freqdist(
+        self,
+        freqdist: pd.DataFrame,
+        max_words: int=30,
+        colormap: str=None, 
+        background_color: str='white'
+        ) -> WordCloud:
+        """
+        Creates a wordcloud image from the most common words in a
+        frequency distribution
+
+        Args:
+            freqdist (pd.DataFrame): 
+                word counts created by the create_freqdist function
+        """
+        
         self.logger.info('Creating wordcloud')
         
         # create frequency distribution dictionary
-        fd = self.create_freqdist(preprocessed_text, max_words=max_words)
-        fd = fd.set_index('word')['count'].to_dict()
+        fd = freqdist[:max_words].set_index('word')['count'].to_dict()
         
         # create wordcloud
         wordcloud = WordCloud(
@@ -216,20 +321,21 @@ class SentimentAnalyser:
         # flatten preprocessed_text list
         flattened_text = self._flatten_preprocessed_text(preprocessed_text)
         
-        # create distribution and sort by count
-        fd = FreqDist(flattened_text)
+        # count words, most_common returns them sorted by count
+        counts = collections.Counter(flattened_text)
         dist = pd.DataFrame.from_records(
-                data=fd.most_common(),
+                data=counts.most_common(max_words or None),
                 columns=['word', 'count']
-        ).sort_values(by='count', ascending=False)
+        )
         
-        return dist[:max_words] if max_words else dist
+        return dist
 
     def sentiment_score(
         self,
         preprocessed_text: list,
-        customise_vader: bool=True
-        ) -> list:
+        customise_vader: bool=True,
+        n_jobs: int=-1
+        ) -> np.ndarray:
         """
         Analyse preprocessed_text for sentiment using nltk's pretrained
         vader sentiment analyser.
@@ -239,29 +345,17 @@ class SentimentAnalyser:
                 text that has been preprocessed by the preprocess_text function
             customize_vader (bool): 
                 Adds custom financial jargon to vader lexicon of True
+            n_jobs (int):
+                number of processes to score with, -1 uses all cores
         """
         
         self.logger.info('generating sentiment scores')
         
-        # Initialise vader sentiment analyser
-        vader = SentimentIntensityAnalyzer()
-        vader = self._customize_vader(vader) if customise_vader else vader
+        # score chunks of items in parallel
+        chunks = self._split_chunks(preprocessed_text, n_jobs)
+        chunk_scores = Parallel(n_jobs=n_jobs)(
+            delayed(self._score_items)(chunk, customise_vader)
+            for chunk in chunks
+        )
         
-        # calculate sentiment for each item
-        item_scores = []
-        for item in preprocessed_text:
-            
-            # calculate sentiment for each sentence in item
-            sentence_scores = []
-            for sentence in item:
-
-                # join sentence list and get compound sentiment
-                sentence = ' '.join(sentence)
-                score = vader.polarity_scores(sentence)['compound']
-                
-                sentence_scores.append(score)
-            
-            # take mean sentement of all sentences
-            item_scores.append(statistics.mean(sentence_scores))
-                
-        return item_scores
+        return np.concatenate(chunk_scores) if chunk_scores else np.empty(0)
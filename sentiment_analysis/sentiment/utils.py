@@ -1,44 +1,58 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
-from pandas_datareader import data
+import yfinance as yf
 
 from sentiment_analysis.API.reddit import RedditAPI
 
 
 def merge_sentiment_submissions(
-    sentiment_scores: list,
-    text: list,
-    submissions: pd.DataFrame,
-    on: str
+    sentiment_scores: np.ndarray,
+    submissions: pd.DataFrame
     ) -> pd.DataFrame:
     """
     Merge sentiment scores from SentimentAnalyser.sentiment_scores with
     reddit submissions from API.reddit.RedditAPI
 
     Args:
-        sentiment_scores (list): sentiment scores list
-        text (list): text used to generate sentiment scores
+        sentiment_scores (np.ndarray): sentiment scores array
         submissions (pd.DataFrame): submissions from reddit API
         
-    Note: It is assumed that sentiment scores and text are correctly ordered
+    Note: It is assumed that sentiment scores are in the same order as
+    submissions
     """
     
-    # create dataframe with text and its corresponding sentiment score
-    text_sentiment = pd.DataFrame(
-        zip(text, sentiment_scores),
-        columns=[on, 'sentiment_score']
-    )
-    
-    # merge with submissions
-    merged = pd.merge(
-        left=submissions,
-        right=text_sentiment,
-        on=on
+    # scores line up row for row, so no join on text is needed
+    merged = submissions.assign(
+        sentiment_score=sentiment_scores
     ).sort_values('created_utc')
     
     return merged
 
+def rolling_mean(values: pd.Series, window: int) -> np.ndarray:
+    """
+    Fixed window rolling mean using NumPy convolution, equivalent to
+    values.rolling(window).mean() without pandas' rolling machinery
+
+    Args:
+        values (pd.Series): values to smooth
+        window (int): number of values in each window
+
+    Returns:
+        np.ndarray: rolling means, NaN until the first full window
+    """
+    
+    values = values.to_numpy(dtype=np.float64)
+    smoothed = np.full_like(values, np.nan)
+    
+    # only full windows have a mean
+    if 0 < window <= len(values):
+        kernel = np.ones(window, dtype=np.float64) / window
+        smoothed[window - 1:] = np.convolve(values, kernel, mode='valid')
+    
+    return smoothed
+
 def get_data(
     ticker: str,
     limit: int,
@@ -93,12 +107,13 @@ def get_data(
     # get submissions
     submissions = reddit.get_submissions(params)
     
-    # get historical stock price data
-    price_data = data.DataReader(
-        name=ticker,
-        data_source='yahoo',
+    # get historical stock price data, yfinance excludes the end date
+    price_data = yf.download(
+        tickers=ticker,
         start=submissions.created_utc.min().date(),
-        end=submissions.created_utc.max().date(),
+        end=submissions.created_utc.max().date() + timedelta(days=1),
+        progress=False,
+        threads=True
     )
     
     return submissions, price_data